@@ -8,9 +8,6 @@ import streaks
 import streaks_test
 
 
-# this is useful instead of using datetime.datetime.min because it allows us to
-# add and subtract timezone offsets without throwing RangeError.
-_DT_MIN = datetime.datetime.min + datetime.timedelta(days=3)
 _ZERO = datetime.timedelta(0)
 
 
@@ -31,8 +28,8 @@ class Checkoff(streaks.StreakInterface):
 
     def __init__(self):
         super(Checkoff, self).__init__()
-        self.interval_start = LocalTime(dt=_DT_MIN, tz=_ZERO)
-        self.interval_end = LocalTime(dt=_DT_MIN, tz=_ZERO)
+        self.interval_start = LocalTime(dt=streaks.DT_MIN, tz=_ZERO)
+        self.interval_end = LocalTime(dt=streaks.DT_MIN, tz=_ZERO)
         self.previous_interval = None
 
     def __repr__(self):
@@ -41,6 +38,11 @@ class Checkoff(streaks.StreakInterface):
             "interval_end",
             "previous_interval"], sep=',\n')
 
+    @property
+    def recent_tz(self):
+        """The timezone offset of the latest local time we've seen."""
+        return self.interval_end.tz
+
     def validate_client_dt(self, untrusted_tzoffset):
         """Clamp the client's reported timezone offset to something sane.
 
@@ -164,7 +166,7 @@ class Checkoff(streaks.StreakInterface):
 
         elif self.has_reset(current.dt):
             # Save the last streak interval (TODO: get this from the calendar)
-            if self.interval_start.dt is not _DT_MIN:
+            if self.interval_start.dt is not streaks.DT_MIN:
                 self.previous_interval = (self.interval_start,
                                           self.interval_end)
             self.interval_start = current
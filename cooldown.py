@@ -0,0 +1,53 @@
+import datetime
+
+import streaks
+import util
+
+
+class Cooldown(streaks.StreakInterface):
+    """Counts activity that's at least `hours` apart, resetting after `limit`.
+
+    Only the server's clock matters; the client's reported time is ignored.
+    `clock` returns the current server time in UTC, and is used whenever a
+    caller doesn't pass the server time explicitly.
+    """
+
+    def __init__(self, hours, limit, clock=datetime.datetime.utcnow):
+        super(Cooldown, self).__init__()
+        self.cooldown = datetime.timedelta(hours=hours)
+        self.expiry = datetime.timedelta(hours=limit)
+        self.clock = clock
+
+        self.last_activity = streaks.DT_MIN
+        self.streak_level = 0
+
+    def __repr__(self):
+        return util.easyrepr(self, [
+            "cooldown", "expiry", "last_activity", "streak_level"])
+
+    @property
+    def server_dt_utc(self):
+        return self.clock()
+
+    def has_reset(self, utc_dt=None):
+        if utc_dt is None:
+            utc_dt = self.server_dt_utc
+        return utc_dt - self.last_activity >= self.expiry
+
+    def record_activity(self, untrusted_client_dt, utc_dt=None):
+        if utc_dt is None:
+            utc_dt = self.server_dt_utc
+
+        if self.has_reset(utc_dt):
+            self.streak_level = 0
+
+        if utc_dt - self.last_activity >= self.cooldown:
+            self.streak_level += 1
+
+        self.last_activity = utc_dt
+
+    def streak_length(self, basis_dt=None):
+        if self.has_reset():
+            return 0
+        else:
+            return self.streak_level
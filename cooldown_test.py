@@ -1,51 +1,59 @@
 import unittest
-import datetime
 
-import streaks
+import cooldown
+import streaks_test
 
+_dt = streaks_test.dt_from_str
 
-class Cooldown(streaks.StreakInterface):
 
-    def __init__(self, hours, limit):
-        super(Cooldown, self).__init__()
-        self.cooldown = datetime.timedelta(hours=hours)
-        self.expiry = datetime.timedelta(hours=limit)
-
-        self.last_activity = streaks.DT_MIN
-        self.streak_level = 0
-
-    def has_reset(self):
-        return self.server_dt_utc - self.last_activity >= self.expiry
-
-    def record_activity(self, untrusted_client_dt):
-        if self.has_reset():
-            self.streak_level = 0
-
-        if self.server_dt_utc - self.last_activity >= self.cooldown:
-            self.streak_level += 1
-
-        self.last_activity = self.server_dt_utc
-
-    def streak_length(self, tzoffset=None):
-        if self.has_reset():
-            return 0
-        else:
-            return self.streak_level
-
-
-class Cooldown1648Test(unittest.TestCase, streaks.StreakTestMixin):
+@streaks_test.expect_failures(
+    "test_missed_day_then_expired",
+    "test_missed_day_then_resume",
+    "test_nz_to_hawaii",
+    "test_nz_to_hawaii_slow",
+    "test_quickest_broken_streak",
+    "test_reject_futuristic_tz",
+    "test_reject_past_tz",
+    "test_two_sessions_one_day",
+    "test_tz_at_utc")
+class Cooldown1648Test(unittest.TestCase, streaks_test.StreakTestMixin):
     @property
     def user(self):
         return self._user
 
     def setUp(self):
-        self._user = Cooldown(hours=16, limit=48)
-
-
-class Cooldown1624Test(unittest.TestCase, streaks.StreakTestMixin):
+        streaks_test.StreakTestMixin.setUp(self)
+        self._user = cooldown.Cooldown(hours=16, limit=48,
+                                       clock=lambda: self.utc_dt)
+
+
+@streaks_test.expect_failures(
+    "test_increment_maximum_interval",
+    "test_increment_next_day_later",
+    "test_nz_to_hawaii",
+    "test_nz_to_hawaii_slow",
+    "test_reject_futuristic_tz",
+    "test_reject_past_tz",
+    "test_streak_is_hot_next_day_after",
+    "test_two_sessions_one_day",
+    "test_tz_at_utc")
+class Cooldown1624Test(unittest.TestCase, streaks_test.StreakTestMixin):
     @property
     def user(self):
         return self._user
 
     def setUp(self):
-        self._user = Cooldown(hours=16, limit=24)
+        streaks_test.StreakTestMixin.setUp(self)
+        self._user = cooldown.Cooldown(hours=16, limit=24,
+                                       clock=lambda: self.utc_dt)
+
+
+class CooldownClockTest(unittest.TestCase):
+    def test_explicit_utc_dt(self):
+        # An explicit server time wins over the clock.
+        clock = [_dt("Mon 00:00")]
+        user = cooldown.Cooldown(hours=16, limit=48, clock=lambda: clock[0])
+        user.record_activity(_dt("Mon 08:00"), _dt("Mon 08:00"))
+        user.record_activity(_dt("Tue 08:00"), _dt("Tue 08:00"))
+        clock[0] = _dt("Tue 12:00")
+        self.assertEqual(user.streak_length(), 2)
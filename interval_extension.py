@@ -0,0 +1,48 @@
+import datetime
+
+import streaks
+import util
+
+
+class IntervalExtension(streaks.StreakInterface):
+    """A streak continues as long as activity is at most `hours` apart.
+
+    Only the server's clock matters; the client's reported time is ignored.
+    `clock` returns the current server time in UTC, and is used whenever a
+    caller doesn't pass the server time explicitly.
+    """
+
+    def __init__(self, hours=48, clock=datetime.datetime.utcnow):
+        super(IntervalExtension, self).__init__()
+        self.extension_limit = datetime.timedelta(hours=hours)
+        self.clock = clock
+        self.last_activity = streaks.DT_MIN
+        self.interval_start = streaks.DT_MIN
+
+    def __repr__(self):
+        return util.easyrepr(self, [
+            "extension_limit", "last_activity", "interval_start"])
+
+    @property
+    def server_dt_utc(self):
+        return self.clock()
+
+    def record_activity(self, untrusted_client_dt, utc_dt=None):
+        if utc_dt is None:
+            utc_dt = self.server_dt_utc
+
+        if self.has_reset(utc_dt):
+            self.interval_start = utc_dt
+
+        self.last_activity = utc_dt
+
+    def streak_length(self, basis_dt=None):
+        if self.has_reset():
+            return 0
+
+        return (self.last_activity - self.interval_start).days + 1
+
+    def has_reset(self, utc_dt=None):
+        if utc_dt is None:
+            utc_dt = self.server_dt_utc
+        return utc_dt - self.last_activity > self.extension_limit
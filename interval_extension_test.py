@@ -1,37 +1,38 @@
-import datetime
 import unittest
 
-import streaks
+import interval_extension
+import streaks_test
 
+_dt = streaks_test.dt_from_str
 
-class IntervalExtension(streaks.StreakInterface):
 
-    def __init__(self, hours=48):
-        super(IntervalExtension, self).__init__()
-        self.extension_limit = datetime.timedelta(hours=hours)
-        self.last_activity = streaks.DT_MIN
-        self.interval_start = streaks.DT_MIN
-
-    def record_activity(self, untrusted_client_dt):
-        if self.has_reset():
-            self.interval_start = self.server_dt_utc
-
-        self.last_activity = self.server_dt_utc
-
-    def streak_length(self, tzoffset=None):
-        if self.has_reset():
-            return 0
-
-        return (self.last_activity - self.interval_start).days + 1
-
-    def has_reset(self):
-        return self.server_dt_utc - self.last_activity > self.extension_limit
-
-
-class IntervalExtensionTest(unittest.TestCase, streaks.StreakTestMixin):
+@streaks_test.expect_failures(
+    "test_increment_next_day_early",
+    "test_missed_day_then_expired",
+    "test_missed_day_then_resume",
+    "test_nz_to_hawaii",
+    "test_nz_to_hawaii_slow",
+    "test_quickest_broken_streak",
+    "test_reject_futuristic_tz",
+    "test_reject_past_tz",
+    "test_tz_at_plus_8")
+class IntervalExtensionTest(unittest.TestCase, streaks_test.StreakTestMixin):
     @property
     def user(self):
         return self._user
 
     def setUp(self):
-        self._user = IntervalExtension()
+        streaks_test.StreakTestMixin.setUp(self)
+        self._user = interval_extension.IntervalExtension(
+            clock=lambda: self.utc_dt)
+
+
+class IntervalExtensionClockTest(unittest.TestCase):
+    def test_explicit_utc_dt(self):
+        # An explicit server time wins over the clock.
+        clock = [_dt("Mon 00:00")]
+        user = interval_extension.IntervalExtension(clock=lambda: clock[0])
+        user.record_activity(_dt("Mon 08:00"), _dt("Mon 08:00"))
+        user.record_activity(_dt("Wed 07:00"), _dt("Wed 07:00"))
+        clock[0] = _dt("Wed 12:00")
+        self.assertEqual(user.streak_length(), 2)
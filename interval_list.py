@@ -1,13 +1,18 @@
 import datetime
 import logging
 
+import streaks
 import util
 
-# this is useful instead of using datetime.datetime.min because it allows us to
-# add and subtract timezone offsets without throwing RangeError.
-_DT_MIN = datetime.datetime.min + datetime.timedelta(days=3)
 _ZERO = datetime.timedelta(0)
 
+# Out of order events can only move backward in local time by the span of
+# validate_client_dt (26 hours), and then still need to land within a day of an
+# interval to merge with it. Anything that ended before this horizon (relative
+# to the newest interval) can never be touched by insert() again, so it's safe
+# to compact.
+_MERGE_HORIZON = datetime.timedelta(days=4)
+
 
 def interval_length(a_dt, b_dt):
     days = (b_dt.date() - a_dt.date()).days
@@ -78,17 +83,96 @@ class StreakInterval(object):
         return util.easyrepr(self, ['begin', 'end'])
 
 
-class IntervalList(object):
-    """A cleaner implementation of Checkoff."""
+class HistorySummary(object):
+    """Aggregate stats for intervals that have been compacted out of memory."""
+
+    def __init__(self):
+        super(HistorySummary, self).__init__()
+        self.count = 0
+        self.longest = 0
+        self.total_days = 0
+
+    def __repr__(self):
+        return util.easyrepr(self, ['count', 'longest', 'total_days'])
+
+    def fold(self, interval):
+        self.count += 1
+        self.longest = max(self.longest, interval.length)
+        self.total_days += interval.length
+
+
+class ListArchive(object):
+    """Keeps compacted intervals in a plain list. Mostly useful for testing."""
 
     def __init__(self):
+        super(ListArchive, self).__init__()
+        self.intervals = []
+
+    def extend(self, intervals):
+        self.intervals.extend(intervals)
+
+    def load(self):
+        return list(self.intervals)
+
+
+class FileArchive(object):
+    """Appends compacted intervals to a file, one per line.
+
+    Nothing is read back until someone calls load(), so the archive costs no
+    memory for users who never ask about their old streaks.
+    """
+
+    _FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+    def __init__(self, path):
+        super(FileArchive, self).__init__()
+        self.path = path
+
+    def __repr__(self):
+        return util.easyrepr(self, ['path'])
+
+    def extend(self, intervals):
+        with open(self.path, 'a') as f:
+            for i in intervals:
+                f.write('%s %s\n' % (i.begin.strftime(self._FORMAT),
+                                     i.end.strftime(self._FORMAT)))
+
+    def load(self):
+        try:
+            f = open(self.path)
+        except IOError:
+            return []
+
+        with f:
+            return [StreakInterval(*[
+                datetime.datetime.strptime(s, self._FORMAT)
+                for s in line.split()]) for line in f]
+
+
+class IntervalList(object):
+    """A cleaner implementation of Checkoff.
+
+    By default every interval is kept forever. Pass `retain` (a number of
+    intervals) and/or `window` (a timedelta, measured back from the end of the
+    newest interval) to bound memory: older intervals are folded into
+    `summary` and, if an `archive` is given, spilled there so that
+    full_history() can rehydrate them later.
+    """
+
+    def __init__(self, retain=None, window=None, archive=None):
         super(IntervalList, self).__init__()
+        if retain is not None and retain < 1:
+            raise ValueError("retain must be at least 1")
         self.history = []
-        self.updated_utc = _DT_MIN
+        self.updated_utc = streaks.DT_MIN
         self.recent_tz = _ZERO
+        self.retain = retain
+        self.window = window
+        self.archive = archive
+        self.summary = HistorySummary()
 
     def __repr__(self):
-        return util.easyrepr(self, ["history"])
+        return util.easyrepr(self, ["history", "summary"])
 
     def record_activity(self, untrusted_client_dt, utc_dt):
         # Events should always arrive in order from the perspective of UTC.
@@ -114,6 +198,59 @@ class IntervalList(object):
 
         # now insert a new interval to the interval list
         insert(untrusted_client_dt, self.history)
+        self.compact()
+
+    def compact(self):
+        """Fold intervals that fall outside the retention policy."""
+        if self.retain is None and self.window is None:
+            return
+
+        newest_end = self.history[-1].end
+        n = 0
+        for interval in self.history:
+            if newest_end - interval.end < _MERGE_HORIZON:
+                # insert() might still merge into this one; keep it hot.
+                break
+            hot = len(self.history) - n
+            too_many = self.retain is not None and hot > self.retain
+            too_old = (self.window is not None and
+                       newest_end - interval.end > self.window)
+            if not (too_many or too_old):
+                break
+            n += 1
+
+        if not n:
+            return
+
+        cold = self.history[:n]
+        for interval in cold:
+            self.summary.fold(interval)
+        if self.archive is not None:
+            self.archive.extend(cold)
+        del self.history[:n]
+
+    def full_history(self):
+        """Return every interval, including compacted ones, oldest first."""
+        if self.archive is None:
+            if self.summary.count:
+                raise ValueError(
+                    "%d intervals were compacted without an archive" %
+                    self.summary.count)
+            return list(self.history)
+
+        return self.archive.load() + self.history
+
+    @property
+    def streak_count(self):
+        return self.summary.count + len(self.history)
+
+    @property
+    def longest_streak(self):
+        return max([self.summary.longest] + [i.length for i in self.history])
+
+    @property
+    def total_active_days(self):
+        return self.summary.total_days + sum(i.length for i in self.history)
 
     def validate_client_dt(self, untrusted_tzoffset):
         """Clamp the client's reported timezone offset to something sane.
@@ -1,3 +1,6 @@
+import datetime
+import os
+import tempfile
 import unittest
 
 import streaks_test
@@ -12,3 +15,83 @@ class IntervalListTest(unittest.TestCase, streaks_test.StreakTestMixin):
     def setUp(self):
         streaks_test.StreakTestMixin.setUp(self)
         self._user = interval_list.IntervalList()
+
+
+class IntervalListRetainOneTest(IntervalListTest):
+    """Aggressive compaction shouldn't change any streak behaviour."""
+
+    def setUp(self):
+        streaks_test.StreakTestMixin.setUp(self)
+        self._user = interval_list.IntervalList(retain=1)
+
+
+class IntervalListRetentionTest(unittest.TestCase):
+    def setUp(self):
+        self.archive = interval_list.ListArchive()
+        self.user = interval_list.IntervalList(retain=2, archive=self.archive)
+
+    def record_days(self, days):
+        for d in days:
+            dt = datetime.datetime(2014, 11, 1, 12) + datetime.timedelta(d)
+            self.user.record_activity(dt, dt)
+
+    def test_history_is_bounded(self):
+        # a 1 day streak every 5 days for a year
+        self.record_days(range(0, 365, 5))
+        self.assertEqual(len(self.user.history), 2)
+        self.assertEqual(self.user.summary.count, 71)
+        self.assertEqual(self.user.streak_count, 73)
+
+    def test_summary(self):
+        self.record_days([0, 1, 2, 10, 20, 21, 30, 40])
+        self.assertEqual(self.user.streak_count, 5)
+        self.assertEqual(self.user.longest_streak, 3)
+        self.assertEqual(self.user.total_active_days, 3 + 1 + 2 + 1 + 1)
+
+    def test_full_history(self):
+        self.record_days([0, 1, 2, 10, 20, 21, 30, 40])
+        self.assertEqual([i.length for i in self.user.full_history()],
+                         [3, 1, 2, 1, 1])
+
+    def test_full_history_without_archive(self):
+        self.user = interval_list.IntervalList(retain=1)
+        self.record_days([0, 10, 20])
+        self.assertRaises(ValueError, self.user.full_history)
+
+    def test_window(self):
+        self.user = interval_list.IntervalList(
+            window=datetime.timedelta(days=15))
+        self.record_days([0, 10, 20, 30])
+        self.assertEqual(len(self.user.history), 2)
+        self.assertEqual(self.user.summary.count, 2)
+
+    def test_recent_intervals_stay_hot(self):
+        # Intervals close enough to still be merged by an out of order event
+        # are never compacted, whatever the policy says.
+        self.user = interval_list.IntervalList(retain=1)
+        self.record_days([0, 3])
+        self.assertEqual(len(self.user.history), 2)
+        self.assertEqual(self.user.summary.count, 0)
+
+
+class FileArchiveTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_missing_file(self):
+        self.assertEqual(interval_list.FileArchive(self.path).load(), [])
+
+    def test_round_trip(self):
+        archive = interval_list.FileArchive(self.path)
+        a = datetime.datetime(2014, 11, 24, 7, 30)
+        b = datetime.datetime(2014, 11, 26, 23, 59, 1, 5)
+        archive.extend([interval_list.StreakInterval(a, b)])
+        archive.extend([interval_list.StreakInterval(b, b)])
+        loaded = archive.load()
+        self.assertEqual([(i.begin, i.end) for i in loaded], [(a, b), (b, b)])
@@ -0,0 +1,248 @@
+"""Read-only streak state shared between processes.
+
+Pre-forked workers that only ever call streak_length don't need their own copy
+of every user's IntervalList or Checkoff. All a streak lookup needs is the
+first and last day of the most recent interval, so we pack that into
+fixed-width records in an mmap and let every worker read the same pages.
+
+The layout is a header followed by an open addressing hash table:
+
+    header:  magic (8s), capacity (I), record size (I)
+    record:  seq (I), key (32s), begin day ordinal (i), end day ordinal (i)
+
+There's exactly one writer. Each record is guarded by a seqlock: the writer
+bumps `seq` to an odd number, writes the record, then bumps it again to an even
+number. Readers retry until they see the same even `seq` on both sides of their
+read, so they never see a torn record. Keys are never removed, so a probe
+sequence that's valid once stays valid.
+"""
+
+import datetime
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+
+import interval_list
+import streaks
+import util
+
+_MAGIC = b'STREAKS1'
+_HEADER = struct.Struct('<8sII')
+_RECORD = struct.Struct('<I32sii')
+_SEQ = struct.Struct('<I')
+# Everything in a record after seq. It's always packed separately from seq,
+# because pack_into may zero its target before writing, and a zeroed seq looks
+# like a stable record to readers.
+_PAYLOAD = struct.Struct('<32sii')
+_KEY_SIZE = 32
+
+# A reader that keeps seeing an odd seq for this many seconds is probably
+# looking at a record whose writer died mid-update. Give up rather than spin
+# forever. Healthy writers only hold a record for a few microseconds, but they
+# can be descheduled in the middle of an update on a busy host.
+_READ_TIMEOUT = 1.0
+
+
+def tail_days(state):
+    """Return (begin, end) day ordinals of a state's most recent interval.
+
+    Works for IntervalList and Checkoff. Returns (0, 0) if there's no activity.
+    """
+    if hasattr(state, 'history'):
+        if not state.history:
+            return 0, 0
+        tail = state.history[-1]
+        return tail.begin.toordinal(), tail.end.toordinal()
+    else:
+        if state.interval_end.dt == streaks.DT_MIN:
+            return 0, 0
+        return (state.interval_start.dt.toordinal(),
+                state.interval_end.dt.toordinal())
+
+
+def streak_length_from_days(begin, end, basis_dt):
+    """Same as IntervalList.streak_length, but from tail_days output."""
+    if not end:
+        return 0
+
+    end_dt = datetime.datetime.fromordinal(end)
+    if not interval_list.are_contiguous_dt(end_dt, basis_dt):
+        return 0
+
+    return interval_list.interval_length(
+        datetime.datetime.fromordinal(begin), end_dt)
+
+
+def _encode_key(key):
+    if not isinstance(key, bytes):
+        key = key.encode('utf-8')
+    if not key or len(key) > _KEY_SIZE or b'\0' in key:
+        raise ValueError("keys must be 1-%d bytes with no NULs: %r" %
+                         (_KEY_SIZE, key))
+    return key
+
+
+def _temp_path_for(path):
+    """Reserve a file next to path that can be renamed over it atomically."""
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        # mkstemp makes the file 0600, but readers may run as other users.
+        # Give it the mode open() would have, i.e. respect the umask.
+        umask = os.umask(0)
+        os.umask(umask)
+        os.fchmod(fd, 0o666 & ~umask)
+    finally:
+        os.close(fd)
+    return tmp_path
+
+
+class SharedStateSegment(object):
+    """A fixed capacity table of streak tails in shared memory.
+
+    Create it with a path to get a file-backed segment that unrelated
+    processes can attach() to, or without one to get an anonymous mapping
+    that's shared with any process forked afterwards.
+
+    Creating a segment at a path that already exists builds the new one in a
+    temporary file and renames it into place, so processes attached to the old
+    segment keep reading it undisturbed until they attach() again.
+    """
+
+    def __init__(self, capacity, path=None):
+        super(SharedStateSegment, self).__init__()
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        size = _HEADER.size + capacity * _RECORD.size
+        self.capacity = capacity
+        self.path = path
+        if path is None:
+            self._buf = mmap.mmap(-1, size)
+            _HEADER.pack_into(self._buf, 0, _MAGIC, capacity, _RECORD.size)
+        else:
+            tmp_path = _temp_path_for(path)
+            try:
+                with open(tmp_path, 'w+b') as f:
+                    f.truncate(size)
+                    self._buf = mmap.mmap(f.fileno(), size)
+                _HEADER.pack_into(self._buf, 0, _MAGIC, capacity,
+                                  _RECORD.size)
+                os.rename(tmp_path, path)
+            except Exception:
+                os.remove(tmp_path)
+                raise
+
+    def __repr__(self):
+        return util.easyrepr(self, ['capacity', 'path'])
+
+    @classmethod
+    def attach(cls, path):
+        """Map an existing segment created by another process.
+
+        The mapping is read-only: only the process that created the segment
+        may publish to it.
+        """
+        self = cls.__new__(cls)
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError("%s is not a streak state segment" % path)
+            buf = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        magic, capacity, record_size = _HEADER.unpack_from(buf, 0)
+        if (magic != _MAGIC or record_size != _RECORD.size or not capacity or
+                size < _HEADER.size + capacity * _RECORD.size):
+            buf.close()
+            raise ValueError("%s is not a streak state segment" % path)
+        self.capacity = capacity
+        self.path = path
+        self._buf = buf
+        return self
+
+    @classmethod
+    def from_states(cls, states, capacity=None, path=None):
+        """Export a {key: IntervalList or Checkoff} mapping."""
+        if capacity is None:
+            # keep the load factor at 50% so probes stay short
+            capacity = max(1, 2 * len(states))
+        if path is None:
+            segment = cls(capacity)
+            for key, state in states.items():
+                segment.publish(key, state)
+            return segment
+
+        # Fill the segment in before anyone can attach to it.
+        tmp_path = _temp_path_for(path)
+        try:
+            segment = cls(capacity, tmp_path)
+            for key, state in states.items():
+                segment.publish(key, state)
+            os.rename(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        segment.path = path
+        return segment
+
+    def close(self):
+        self._buf.close()
+
+    def _offset(self, slot):
+        return _HEADER.size + slot * _RECORD.size
+
+    def _read(self, offset):
+        """Read a consistent copy of the record at offset."""
+        deadline = None
+        while True:
+            seq = _SEQ.unpack_from(self._buf, offset)[0]
+            if not seq & 1:
+                key, begin, end = _PAYLOAD.unpack_from(
+                    self._buf, offset + _SEQ.size)
+                if _SEQ.unpack_from(self._buf, offset)[0] == seq:
+                    return key.rstrip(b'\0'), begin, end
+
+            # The writer is mid-update. Let it run before trying again.
+            now = time.time()
+            if deadline is None:
+                deadline = now + _READ_TIMEOUT
+            elif now > deadline:
+                break
+            time.sleep(0)
+        raise RuntimeError("record at offset %d is stuck mid-write" % offset)
+
+    def _find(self, key):
+        """Return (offset, record) for key, or for the empty slot it'd use."""
+        slot = zlib.crc32(key) % self.capacity
+        for _ in range(self.capacity):
+            offset = self._offset(slot)
+            record = self._read(offset)
+            if record[0] == key or not record[0]:
+                return offset, record
+            slot = (slot + 1) % self.capacity
+        return None, None
+
+    def publish_days(self, key, begin, end):
+        """Write a user's tail. Must only be called from the writer process."""
+        key = _encode_key(key)
+        offset, record = self._find(key)
+        if offset is None:
+            raise ValueError("segment is full (capacity %d)" % self.capacity)
+
+        # seq wraps around; only its parity matters to readers
+        seq = _SEQ.unpack_from(self._buf, offset)[0]
+        _SEQ.pack_into(self._buf, offset, (seq + 1) & 0xFFFFFFFF)
+        _PAYLOAD.pack_into(self._buf, offset + _SEQ.size, key, begin, end)
+        _SEQ.pack_into(self._buf, offset, (seq + 2) & 0xFFFFFFFF)
+
+    def publish(self, key, state):
+        self.publish_days(key, *tail_days(state))
+
+    def streak_length(self, key, basis_dt):
+        """Look up a user's streak. Unknown users have no streak."""
+        offset, record = self._find(_encode_key(key))
+        if offset is None or not record[0]:
+            return 0
+        return streak_length_from_days(record[1], record[2], basis_dt)
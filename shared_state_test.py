@@ -0,0 +1,184 @@
+import datetime
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+
+import checkoff_test
+import interval_list
+import shared_state
+import streaks_test
+
+_dt = streaks_test.dt_from_str
+
+
+def _users():
+    a = interval_list.IntervalList()
+    b = checkoff_test.Checkoff()
+    for s in ["Mon 10:00", "Tue 10:00", "Wed 10:00"]:
+        a.record_activity(_dt(s), _dt(s))
+        b.record_activity(_dt(s), _dt(s))
+    return {'alice': a, 'bob': b, 'carol': interval_list.IntervalList()}
+
+
+def _read_in_child(segment, queue):
+    queue.put(segment.streak_length('alice', _dt("Thu 12:00")))
+
+
+def _publish_until_stopped(segment, stop):
+    day = datetime.datetime(2014, 11, 24).toordinal()
+    n = 0
+    while not stop.is_set():
+        # alternate between a 3 day and a 1 day streak ending on Wed
+        segment.publish_days('alice', day + 2 * (n % 2), day + 2)
+        n += 1
+
+
+class SharedStateSegmentTest(unittest.TestCase):
+    def setUp(self):
+        self.users = _users()
+        self.segment = shared_state.SharedStateSegment.from_states(self.users)
+
+    def tearDown(self):
+        self.segment.close()
+
+    def test_matches_states(self):
+        for basis in ["Wed 12:00", "Thu 23:00", "Fri 00:01"]:
+            for key, user in self.users.items():
+                self.assertEqual(self.segment.streak_length(key, _dt(basis)),
+                                 user.streak_length(_dt(basis)))
+
+    def test_unknown_user(self):
+        self.assertEqual(self.segment.streak_length('dave', _dt("Wed 12:00")),
+                         0)
+
+    def test_update(self):
+        user = self.users['alice']
+        user.record_activity(_dt("Thu 10:00"), _dt("Thu 10:00"))
+        self.segment.publish('alice', user)
+        self.assertEqual(self.segment.streak_length('alice', _dt("Thu 12:00")),
+                         4)
+
+    def test_full(self):
+        segment = shared_state.SharedStateSegment(1)
+        segment.publish('alice', self.users['alice'])
+        self.assertRaises(ValueError, segment.publish, 'bob',
+                          self.users['bob'])
+
+    def test_bad_key(self):
+        self.assertRaises(ValueError, self.segment.publish, 'x' * 33,
+                          self.users['alice'])
+
+    def test_torn_record(self):
+        # Simulate a writer that died halfway through an update.
+        offset, _ = self.segment._find(b'alice')
+        seq = shared_state._SEQ.unpack_from(self.segment._buf, offset)[0]
+        shared_state._SEQ.pack_into(self.segment._buf, offset, seq + 1)
+        self.assertRaises(RuntimeError, self.segment.streak_length, 'alice',
+                          _dt("Wed 12:00"))
+
+    def test_empty_checkoff(self):
+        self.assertEqual(shared_state.tail_days(checkoff_test.Checkoff()),
+                         (0, 0))
+
+    def test_seq_wraps(self):
+        offset, _ = self.segment._find(b'alice')
+        shared_state._SEQ.pack_into(self.segment._buf, offset, 0xFFFFFFFE)
+        self.segment.publish_days('alice', 1, 1)
+        self.assertEqual(
+            shared_state._SEQ.unpack_from(self.segment._buf, offset)[0], 0)
+        self.assertEqual(self.segment._read(offset), (b'alice', 1, 1))
+
+    def test_read_during_writes(self):
+        stop = multiprocessing.Event()
+        writer = multiprocessing.Process(target=_publish_until_stopped,
+                                         args=(self.segment, stop))
+        writer.start()
+        try:
+            seen = set()
+            deadline = time.time() + 0.5
+            while time.time() < deadline:
+                seen.add(self.segment.streak_length('alice', _dt("Wed 12:00")))
+        finally:
+            stop.set()
+            writer.join()
+        self.assertTrue(seen <= set([1, 3]), seen)
+
+    def test_forked_reader(self):
+        queue = multiprocessing.Queue()
+        p = multiprocessing.Process(target=_read_in_child,
+                                    args=(self.segment, queue))
+        p.start()
+        p.join()
+        self.assertEqual(queue.get(), 3)
+
+
+class AttachTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_attach(self):
+        writer = shared_state.SharedStateSegment.from_states(
+            _users(), path=self.path)
+        reader = shared_state.SharedStateSegment.attach(self.path)
+        self.assertEqual(reader.streak_length('bob', _dt("Wed 12:00")), 3)
+
+        # the reader sees the writer's updates without re-attaching
+        day = datetime.datetime(2014, 11, 27).toordinal()
+        writer.publish_days('dave', day, day)
+        self.assertEqual(reader.streak_length('dave', _dt("Thu 12:00")), 1)
+        writer.close()
+        reader.close()
+
+    def test_reexport_keeps_attached_readers(self):
+        shared_state.SharedStateSegment.from_states(_users(), path=self.path)
+        reader = shared_state.SharedStateSegment.attach(self.path)
+        shared_state.SharedStateSegment.from_states({}, path=self.path)
+        self.assertEqual(reader.streak_length('bob', _dt("Wed 12:00")), 3)
+        reader.close()
+
+        reader = shared_state.SharedStateSegment.attach(self.path)
+        self.assertEqual(reader.streak_length('bob', _dt("Wed 12:00")), 0)
+        reader.close()
+
+    def test_attach_is_read_only(self):
+        writer = shared_state.SharedStateSegment.from_states(
+            _users(), path=self.path)
+        os.chmod(self.path, 0o444)
+        reader = shared_state.SharedStateSegment.attach(self.path)
+        self.assertRaises(TypeError, reader.publish_days, 'bob', 1, 1)
+        self.assertEqual(reader.streak_length('bob', _dt("Wed 12:00")), 3)
+        writer.close()
+        reader.close()
+
+    def test_respects_umask(self):
+        umask = os.umask(0o022)
+        try:
+            shared_state.SharedStateSegment.from_states({}, path=self.path)
+        finally:
+            os.umask(umask)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o644)
+
+    def test_attach_short_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * 4)
+        self.assertRaises(ValueError, shared_state.SharedStateSegment.attach,
+                          self.path)
+
+    def test_attach_truncated(self):
+        shared_state.SharedStateSegment.from_states(_users(), path=self.path)
+        with open(self.path, 'r+b') as f:
+            f.truncate(shared_state._HEADER.size + 1)
+        self.assertRaises(ValueError, shared_state.SharedStateSegment.attach,
+                          self.path)
+
+    def test_attach_garbage(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * 64)
+        self.assertRaises(ValueError, shared_state.SharedStateSegment.attach,
+                          self.path)
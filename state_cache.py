@@ -0,0 +1,185 @@
+"""An LRU cache of deserialized streak state in front of persistent storage.
+
+Most lookups are for the same small set of daily active users, so rather than
+loading and re-saving a user's whole IntervalList on every request we keep the
+most recently used ones in memory. Modified states are only written back when
+they're evicted, when flush() is called, or when `flush_interval` seconds have
+passed since the last flush (checked on each use of the cache and by tick()).
+
+A store is anything with load(key) (returning None for unknown users) and
+save(key, state) methods.
+"""
+
+import binascii
+import collections
+import os
+import pickle
+import time
+
+import interval_list
+import util
+
+
+class FileStore(object):
+    """Pickles each user's state to its own file.
+
+    This is a stand-in for real storage, useful for tests and benchmarks.
+    """
+
+    def __init__(self, directory):
+        super(FileStore, self).__init__()
+        self.directory = directory
+
+    def __repr__(self):
+        return util.easyrepr(self, ['directory'])
+
+    def _path(self, key):
+        name = binascii.hexlify(key.encode('utf-8')).decode('ascii')
+        return os.path.join(self.directory, name + '.pickle')
+
+    def load(self, key):
+        try:
+            f = open(self._path(key), 'rb')
+        except IOError:
+            return None
+
+        with f:
+            return pickle.load(f)
+
+    def save(self, key, state):
+        with open(self._path(key), 'wb') as f:
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+
+
+class CacheStats(object):
+    def __init__(self):
+        super(CacheStats, self).__init__()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+
+    def __repr__(self):
+        return util.easyrepr(self, ['hits', 'misses', 'evictions', 'writes'])
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return float(self.hits) / total if total else 0.0
+
+
+class StateCache(object):
+    """Holds up to `capacity` user states, evicting the least recently used.
+
+    `factory` makes the state for users the store doesn't know about. `clock`
+    returns the current time in seconds and only matters with
+    `flush_interval`.
+
+    The flush interval is only checked when the cache is used or when tick()
+    is called. There's no background thread, so a process that may go idle
+    with dirty states should call tick() periodically (or flush() on
+    shutdown).
+    """
+
+    def __init__(self, store, capacity, factory=interval_list.IntervalList,
+                 flush_interval=None, clock=time.time):
+        super(StateCache, self).__init__()
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.store = store
+        self.capacity = capacity
+        self.factory = factory
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.stats = CacheStats()
+        self._states = collections.OrderedDict()
+        self._dirty = set()
+        self._last_flush = clock()
+
+    def __repr__(self):
+        return util.easyrepr(self, ['capacity', 'stats'])
+
+    def __len__(self):
+        return len(self._states)
+
+    def __contains__(self, key):
+        return key in self._states
+
+    def get(self, key):
+        """Return the state for key, loading it from the store if needed.
+
+        Users the store doesn't know about get a new state from `factory`,
+        which is cached on the assumption that the caller is about to modify
+        it. Use streak_length for read-only lookups.
+        """
+        state = self._lookup(key)
+        if state is None:
+            state = self._insert(key, self.factory())
+        self.tick()
+        return state
+
+    def mark_dirty(self, key):
+        """Note that the cached state for key has been modified."""
+        if key not in self._states:
+            raise KeyError(key)
+        self._dirty.add(key)
+
+    def record_activity(self, key, untrusted_client_dt, utc_dt):
+        self.get(key).record_activity(untrusted_client_dt, utc_dt)
+        self.mark_dirty(key)
+
+    def streak_length(self, key, basis_dt):
+        # Lookups for users with no stored state don't take up a slot, so a
+        # burst of them can't push out the active users.
+        state = self._lookup(key)
+        if state is None:
+            state = self.factory()
+        self.tick()
+        return state.streak_length(basis_dt)
+
+    def tick(self):
+        """Flush if `flush_interval` seconds have passed since the last one."""
+        if (self.flush_interval is not None and
+                self.clock() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write every modified state back to the store."""
+        for key in self._dirty:
+            self.store.save(key, self._states[key])
+            self.stats.writes += 1
+        self._dirty.clear()
+        self._last_flush = self.clock()
+
+    def _lookup(self, key):
+        """Return the cached or stored state for key, or None if neither."""
+        try:
+            state = self._states.pop(key)
+        except KeyError:
+            self.stats.misses += 1
+            state = self.store.load(key)
+            if state is None:
+                return None
+            return self._insert(key, state)
+
+        self.stats.hits += 1
+        # reinserting moves the key to the most recently used end
+        self._states[key] = state
+        return state
+
+    def _insert(self, key, state):
+        if len(self._states) >= self.capacity:
+            self._evict()
+        self._states[key] = state
+        return state
+
+    def _evict(self):
+        key = next(iter(self._states))
+        if key in self._dirty:
+            # Save before forgetting the state, so a failed save doesn't lose
+            # the only copy of it.
+            self.store.save(key, self._states[key])
+            self.stats.writes += 1
+            self._dirty.remove(key)
+        del self._states[key]
+        self.stats.evictions += 1
@@ -0,0 +1,66 @@
+"""Compare StateCache against loading and saving state on every request.
+
+Traffic is skewed towards a small set of users, like daily active users are.
+
+    python state_cache_bench.py [requests] [users] [capacity]
+"""
+
+import datetime
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import interval_list
+import state_cache
+
+
+def traffic(requests, users, seed=0):
+    rng = random.Random(seed)
+    start = datetime.datetime(2014, 11, 24)
+    step = datetime.timedelta(days=30) // requests
+    for n in range(requests):
+        # Pareto-distributed user ids: a few users get most of the requests
+        user = int(rng.paretovariate(0.3)) % users
+        dt = start + n * step
+        yield 'user%d' % user, dt
+
+
+def uncached(store, events):
+    for key, dt in events:
+        state = store.load(key) or interval_list.IntervalList()
+        state.record_activity(dt, dt)
+        store.save(key, state)
+
+
+def cached(store, events, capacity):
+    cache = state_cache.StateCache(store, capacity)
+    for key, dt in events:
+        cache.record_activity(key, dt, dt)
+    cache.flush()
+    return cache.stats
+
+
+def timed(f, *args):
+    directory = tempfile.mkdtemp()
+    try:
+        start = time.time()
+        result = f(state_cache.FileStore(directory), *args)
+        return time.time() - start, result
+    finally:
+        shutil.rmtree(directory)
+
+
+def main(requests=10000, users=5000, capacity=500):
+    events = list(traffic(requests, users))
+    base, _ = timed(uncached, events)
+    fast, stats = timed(cached, events, capacity)
+    print('requests=%d users=%d capacity=%d' % (requests, users, capacity))
+    print('uncached: %.3fs' % base)
+    print('cached:   %.3fs (%.1fx)' % (fast, base / fast))
+    print('%r hit_rate=%.3f' % (stats, stats.hit_rate))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
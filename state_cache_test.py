@@ -0,0 +1,168 @@
+import shutil
+import tempfile
+import unittest
+
+import interval_list
+import state_cache
+import streaks_test
+
+_dt = streaks_test.dt_from_str
+
+
+class DictStore(object):
+    def __init__(self):
+        self.states = {}
+        self.saves = []
+
+    def load(self, key):
+        return self.states.get(key)
+
+    def save(self, key, state):
+        self.states[key] = state
+        self.saves.append(key)
+
+
+class FailingStore(DictStore):
+    def __init__(self):
+        super(FailingStore, self).__init__()
+        self.failing = True
+
+    def save(self, key, state):
+        if self.failing:
+            raise IOError("disk full")
+        super(FailingStore, self).save(key, state)
+
+
+class StateCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 0
+        self.store = DictStore()
+        self.cache = state_cache.StateCache(self.store, capacity=2,
+                                            clock=lambda: self.now)
+
+    def record(self, key, s):
+        self.cache.record_activity(key, _dt(s), _dt(s))
+
+    def test_hit_and_miss(self):
+        self.cache.get('alice')
+        self.cache.get('alice')
+        self.assertEqual(self.cache.stats.misses, 1)
+        self.assertEqual(self.cache.stats.hits, 1)
+        self.assertEqual(self.cache.stats.hit_rate, 0.5)
+
+    def test_new_user(self):
+        self.assertIsInstance(self.cache.get('alice'),
+                              interval_list.IntervalList)
+        self.assertEqual(self.cache.streak_length('alice', _dt("Mon 12:00")),
+                         0)
+
+    def test_lru_eviction(self):
+        self.cache.get('alice')
+        self.cache.get('bob')
+        self.cache.get('alice')
+        self.cache.get('carol')
+        self.assertIn('alice', self.cache)
+        self.assertNotIn('bob', self.cache)
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.stats.evictions, 1)
+
+    def test_clean_eviction_does_not_write(self):
+        self.cache.get('alice')
+        self.cache.get('bob')
+        self.cache.get('carol')
+        self.assertEqual(self.store.saves, [])
+
+    def test_write_behind_on_eviction(self):
+        self.record('alice', "Mon 10:00")
+        self.record('alice', "Tue 10:00")
+        self.assertEqual(self.store.saves, [])
+        self.cache.get('bob')
+        self.cache.get('carol')
+        self.assertEqual(self.store.saves, ['alice'])
+
+        # and it's reloaded from the store next time
+        self.assertEqual(self.cache.streak_length('alice', _dt("Tue 12:00")),
+                         2)
+
+    def test_flush(self):
+        self.record('alice', "Mon 10:00")
+        self.record('bob', "Mon 10:00")
+        self.cache.flush()
+        self.assertEqual(sorted(self.store.saves), ['alice', 'bob'])
+        self.cache.flush()
+        self.assertEqual(self.cache.stats.writes, 2)
+
+    def test_flush_interval(self):
+        self.cache = state_cache.StateCache(self.store, capacity=2,
+                                            flush_interval=60,
+                                            clock=lambda: self.now)
+        self.record('alice', "Mon 10:00")
+        self.now = 59
+        self.cache.get('alice')
+        self.assertEqual(self.store.saves, [])
+        self.now = 60
+        self.cache.get('alice')
+        self.assertEqual(self.store.saves, ['alice'])
+
+    def test_unknown_reads_are_not_cached(self):
+        self.record('alice', "Mon 10:00")
+        self.cache.get('bob')
+        for key in ['x', 'y', 'z']:
+            self.assertEqual(self.cache.streak_length(key, _dt("Mon 12:00")),
+                             0)
+        self.assertIn('alice', self.cache)
+        self.assertIn('bob', self.cache)
+        self.assertEqual(self.cache.stats.evictions, 0)
+        self.assertEqual(self.cache.stats.misses, 5)
+
+    def test_stored_reads_are_cached(self):
+        self.store.states['alice'] = interval_list.IntervalList()
+        self.cache.streak_length('alice', _dt("Mon 12:00"))
+        self.assertIn('alice', self.cache)
+
+    def test_failed_eviction_keeps_state(self):
+        self.store = FailingStore()
+        self.cache = state_cache.StateCache(self.store, capacity=1)
+        self.record('alice', "Mon 10:00")
+        self.assertRaises(IOError, self.cache.get, 'bob')
+        self.assertIn('alice', self.cache)
+        self.assertNotIn('bob', self.cache)
+
+        # it's still dirty, so the next successful eviction saves it
+        self.store.failing = False
+        self.cache.get('bob')
+        self.assertEqual(self.store.saves, ['alice'])
+
+    def test_tick(self):
+        self.cache = state_cache.StateCache(self.store, capacity=2,
+                                            flush_interval=60,
+                                            clock=lambda: self.now)
+        self.record('alice', "Mon 10:00")
+        self.now = 30
+        self.cache.tick()
+        self.assertEqual(self.store.saves, [])
+        self.now = 90
+        self.cache.tick()
+        self.assertEqual(self.store.saves, ['alice'])
+
+    def test_mark_dirty_uncached(self):
+        self.assertRaises(KeyError, self.cache.mark_dirty, 'alice')
+
+
+class FileStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = state_cache.FileStore(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_missing(self):
+        self.assertIsNone(self.store.load('alice'))
+
+    def test_round_trip(self):
+        user = interval_list.IntervalList()
+        user.record_activity(_dt("Mon 10:00"), _dt("Mon 10:00"))
+        self.store.save('alice', user)
+        loaded = self.store.load('alice')
+        self.assertEqual(loaded.streak_length(_dt("Mon 12:00")), 1)
@@ -1,6 +1,11 @@
 """Interface for testing different streak algorithms"""
 
 import abc
+import datetime
+
+# this is useful instead of using datetime.datetime.min because it allows us to
+# add and subtract timezone offsets without throwing RangeError.
+DT_MIN = datetime.datetime.min + datetime.timedelta(days=3)
 
 
 class StreakInterface(object):
@@ -1,6 +1,6 @@
 # This file is a bit strange, a lot of tests are "expected" to fail because the
-# algorithm they use is too simple. But this is confusing because nothing
-# records which tests are supposed to fail.
+# algorithm they use is too simple. Test classes record which ones with the
+# expect_failures decorator, so any other failure is a real regression.
 #
 # All CheckoffTest tests should pass though, because it's an algorithm that
 # works in all circumstances (but has the drawback that it needs to deal with
@@ -10,6 +10,7 @@
 import abc
 import datetime
 import time
+import unittest
 
 # starts on a monday
 _dates = [datetime.date(2014, 11, 24 + _x) for _x in xrange(7)]
@@ -45,6 +46,19 @@ class InconclusiveTestError(Exception):
         super(InconclusiveTestError, self).__init__(message)
 
 
+def expect_failures(*names):
+    """Class decorator marking mixin tests an algorithm is known to fail.
+
+    Tests whose preconditions don't hold for the algorithm (so they raise
+    InconclusiveTestError) count as failures too.
+    """
+    def decorate(cls):
+        for name in names:
+            setattr(cls, name, unittest.expectedFailure(getattr(cls, name)))
+        return cls
+    return decorate
+
+
 class StreakTestMixin(object):
 
     def setUp(self):
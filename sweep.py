@@ -0,0 +1,179 @@
+"""Evaluate many Cooldown and IntervalExtension parameters in one pass.
+
+Answering "what if the cooldown were 12h and the limit 36h?" by replaying the
+event log once per candidate gets slow fast. Instead, Sweep keeps every
+variant's state for a user side by side in flat lists and updates all of them
+for each event, so the log only has to be read once. The arithmetic mirrors
+cooldown.Cooldown and interval_extension.IntervalExtension exactly, with times
+as integer microseconds since the epoch.
+
+Alongside the variants each user also gets a baseline state (by default an
+IntervalList, the cleaner implementation of Checkoff) so results can be
+compared against it.
+"""
+
+import collections
+import datetime
+
+import interval_list
+import util
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_DAY = 24 * 60 * 60 * 10 ** 6
+_HOUR = 60 * 60 * 10 ** 6
+# Stands in for streaks.DT_MIN: far enough in the past that everything resets.
+_NEVER = float('-inf')
+
+
+def _micros(dt):
+    d = dt - _EPOCH
+    return float((d.days * 24 * 60 * 60 + d.seconds) * 10 ** 6 +
+                 d.microseconds)
+
+
+class SweepResult(object):
+    """Streak lengths for one policy variant across every user.
+
+    `distribution` maps streak length to the number of users with it. `diff`
+    maps (variant length - baseline length) to the number of users.
+    """
+
+    def __init__(self, policy, params):
+        super(SweepResult, self).__init__()
+        self.policy = policy
+        self.params = params
+        self.distribution = collections.Counter()
+        self.diff = collections.Counter()
+
+    def __repr__(self):
+        return util.easyrepr(self, ['policy', 'params', 'distribution'])
+
+    @property
+    def differs(self):
+        """How many users get a different streak than the baseline."""
+        return sum(n for d, n in self.diff.items() if d)
+
+
+class _UserState(object):
+    def __init__(self, n_cooldowns, n_extensions, baseline):
+        self.cd_last = [_NEVER] * n_cooldowns
+        self.cd_level = [0] * n_cooldowns
+        self.ie_last = [_NEVER] * n_extensions
+        self.ie_start = [_NEVER] * n_extensions
+        self.baseline = baseline
+
+
+class Sweep(object):
+    """Replays an event log through a grid of policy parameters.
+
+    `cooldowns` is a sequence of (hours, limit) pairs, as passed to Cooldown.
+    `extensions` is a sequence of hours, as passed to IntervalExtension.
+    `baseline` makes the state to compare against. Baselines work in local
+    time, so they must report the user's latest timezone offset as
+    `recent_tz`, like IntervalList and Checkoff do.
+    """
+
+    def __init__(self, cooldowns=(), extensions=(),
+                 baseline=interval_list.IntervalList):
+        super(Sweep, self).__init__()
+        self.cooldowns = list(cooldowns)
+        self.extensions = list(extensions)
+        self.baseline = baseline
+        self.users = {}
+        self._cd_cooldown = [float(h * _HOUR) for h, _ in self.cooldowns]
+        self._cd_expiry = [float(l * _HOUR) for _, l in self.cooldowns]
+        self._ie_limit = [float(h * _HOUR) for h in self.extensions]
+
+    def __repr__(self):
+        return util.easyrepr(self, ['cooldowns', 'extensions'])
+
+    def record_activity(self, key, untrusted_client_dt, utc_dt):
+        """Feed one event. Events must arrive in UTC order."""
+        try:
+            user = self.users[key]
+        except KeyError:
+            user = self.users[key] = _UserState(
+                len(self.cooldowns), len(self.extensions), self.baseline())
+
+        user.baseline.record_activity(untrusted_client_dt, utc_dt)
+        now = _micros(utc_dt)
+
+        last, level = user.cd_last, user.cd_level
+        cooldown, expiry = self._cd_cooldown, self._cd_expiry
+        for i in range(len(last)):
+            elapsed = now - last[i]
+            if elapsed >= expiry[i]:
+                level[i] = 0
+            if elapsed >= cooldown[i]:
+                level[i] += 1
+            last[i] = now
+
+        last, start = user.ie_last, user.ie_start
+        limit = self._ie_limit
+        for i in range(len(last)):
+            if now - last[i] > limit[i]:
+                start[i] = now
+            last[i] = now
+
+    def replay(self, events):
+        """Feed an iterable of (key, untrusted_client_dt, utc_dt) events."""
+        for key, untrusted_client_dt, utc_dt in events:
+            self.record_activity(key, untrusted_client_dt, utc_dt)
+
+    def streak_lengths(self, key, basis_utc):
+        """Return (baseline, cooldowns, extensions) streak lengths for a user.
+
+        The baseline is evaluated at basis_utc shifted into the user's most
+        recent timezone, since it works in local time.
+        """
+        user = self.users[key]
+        now = _micros(basis_utc)
+
+        cooldowns = [
+            0 if now - last >= expiry else level
+            for last, level, expiry in zip(
+                user.cd_last, user.cd_level, self._cd_expiry)]
+
+        extensions = [
+            0 if now - last > limit else int((last - start) // _DAY) + 1
+            for last, start, limit in zip(
+                user.ie_last, user.ie_start, self._ie_limit)]
+
+        local_dt = basis_utc + user.baseline.recent_tz
+        return user.baseline.streak_length(local_dt), cooldowns, extensions
+
+    def results(self, basis_utc):
+        """Summarize every variant's streaks at basis_utc.
+
+        Returns (baseline distribution, list of SweepResult), with cooldowns
+        first in the order they were given, then extensions.
+        """
+        baseline = collections.Counter()
+        results = ([SweepResult('cooldown', p) for p in self.cooldowns] +
+                   [SweepResult('interval_extension', p)
+                    for p in self.extensions])
+
+        for key in self.users:
+            base, cooldowns, extensions = self.streak_lengths(key, basis_utc)
+            baseline[base] += 1
+            for result, length in zip(results, cooldowns + extensions):
+                result.distribution[length] += 1
+                result.diff[length - base] += 1
+
+        return baseline, results
+
+
+def sweep(events, cooldowns=(), extensions=(), basis_utc=None,
+          baseline=interval_list.IntervalList):
+    """Replay events once and summarize every variant.
+
+    basis_utc defaults to the time of the last event.
+    """
+    s = Sweep(cooldowns, extensions, baseline)
+    last_utc = None
+    for key, untrusted_client_dt, utc_dt in events:
+        s.record_activity(key, untrusted_client_dt, utc_dt)
+        last_utc = utc_dt
+    if basis_utc is None:
+        basis_utc = last_utc
+    return s.results(basis_utc)
@@ -0,0 +1,112 @@
+import collections
+import datetime
+import itertools
+import random
+import unittest
+
+import checkoff_test
+import cooldown
+import interval_extension
+import interval_list
+import sweep
+
+_COOLDOWNS = list(itertools.product([8, 12, 16], [24, 36, 48]))
+_EXTENSIONS = [24, 36, 48, 72]
+_USERS = 5
+
+
+def _events(users=_USERS, n=600, seed=0):
+    rng = random.Random(seed)
+    utc_dt = datetime.datetime(2014, 11, 24)
+    tz = dict((u, datetime.timedelta(hours=rng.randint(-10, 13)))
+              for u in range(users))
+    for _ in range(n):
+        utc_dt += datetime.timedelta(minutes=rng.randint(1, 4 * 60))
+        user = rng.randrange(users)
+        yield user, utc_dt + tz[user], utc_dt
+
+
+class SweepTest(unittest.TestCase):
+    def setUp(self):
+        self.events = list(_events())
+        self.basis = self.events[-1][2] + datetime.timedelta(hours=20)
+        self.baseline, self.results = sweep.sweep(
+            self.events, _COOLDOWNS, _EXTENSIONS, self.basis)
+
+    def replay(self, make):
+        """Replay the log through one algorithm per user, the slow way."""
+        clock = [None]
+        users = {}
+        for key, client_dt, utc_dt in self.events:
+            clock[0] = utc_dt
+            if key not in users:
+                users[key] = make(lambda: clock[0])
+            users[key].record_activity(client_dt, utc_dt)
+
+        clock[0] = self.basis
+        return dict((k, u.streak_length()) for k, u in users.items())
+
+    def test_matches_cooldown(self):
+        for (hours, limit), result in zip(_COOLDOWNS, self.results):
+            self.assertEqual(result.policy, 'cooldown')
+            lengths = self.replay(
+                lambda clock: cooldown.Cooldown(hours, limit, clock=clock))
+            self.assertEqual(result.distribution,
+                             collections.Counter(lengths.values()))
+
+    def test_matches_interval_extension(self):
+        results = self.results[len(_COOLDOWNS):]
+        for hours, result in zip(_EXTENSIONS, results):
+            self.assertEqual(result.policy, 'interval_extension')
+            lengths = self.replay(
+                lambda clock: interval_extension.IntervalExtension(
+                    hours, clock=clock))
+            self.assertEqual(result.distribution,
+                             collections.Counter(lengths.values()))
+
+    def test_per_user(self):
+        s = sweep.Sweep(_COOLDOWNS, _EXTENSIONS)
+        s.replay(self.events)
+        lengths = self.replay(
+            lambda clock: cooldown.Cooldown(16, 48, clock=clock))
+        for key, length in lengths.items():
+            cooldowns = s.streak_lengths(key, self.basis)[1]
+            self.assertEqual(cooldowns[_COOLDOWNS.index((16, 48))], length)
+
+    def test_baseline(self):
+        users = {}
+        for key, client_dt, utc_dt in self.events:
+            user = users.setdefault(key, interval_list.IntervalList())
+            user.record_activity(client_dt, utc_dt)
+        lengths = [u.streak_length(self.basis + u.recent_tz)
+                   for u in users.values()]
+        self.assertEqual(self.baseline, collections.Counter(lengths))
+
+    def test_checkoff_baseline(self):
+        users = {}
+        for key, client_dt, utc_dt in self.events:
+            user = users.setdefault(key, checkoff_test.Checkoff())
+            user.record_activity(client_dt, utc_dt)
+        lengths = [u.streak_length(self.basis + u.interval_end.tz)
+                   for u in users.values()]
+
+        baseline, _ = sweep.sweep(self.events, _COOLDOWNS, _EXTENSIONS,
+                                  self.basis, baseline=checkoff_test.Checkoff)
+        self.assertEqual(baseline, collections.Counter(lengths))
+
+    def test_diff(self):
+        for result in self.results:
+            self.assertEqual(sum(result.diff.values()), _USERS)
+            self.assertEqual(result.differs,
+                             _USERS - result.diff.get(0, 0))
+
+    def test_default_basis(self):
+        baseline, results = sweep.sweep(self.events, _COOLDOWNS)
+        self.assertEqual(sum(baseline.values()), _USERS)
+        self.assertEqual(len(results), len(_COOLDOWNS))
+
+    def test_empty(self):
+        baseline, results = sweep.sweep([], _COOLDOWNS, _EXTENSIONS)
+        self.assertEqual(sum(baseline.values()), 0)
+        self.assertEqual(len(results), len(_COOLDOWNS) + len(_EXTENSIONS))
+